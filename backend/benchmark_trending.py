@@ -0,0 +1,47 @@
+"""Measure how many click events per second trending can ingest.
+
+Times record_station_click, which is what a click actually runs: it updates
+every trending window. The per-window rate is printed alongside for reference.
+
+Usage: python benchmark_trending.py [events] [stations]
+"""
+import sys
+import time
+
+import numpy as np
+
+import server
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    stations = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+
+    # Clicks are only counted for stations the backend knows about
+    countries = [f"country-{i}" for i in range(200)]
+    server.similarity_index.add_stations([
+        {"stationuuid": f"station-{i}", "country": countries[i % len(countries)]}
+        for i in range(stations)
+    ])
+
+    # Zipf-distributed clicks: a few stations are hot, most are rarely played
+    rng = np.random.default_rng(42)
+    clicks = [f"station-{i}" for i in (rng.zipf(1.2, size=events) - 1) % stations]
+
+    start = time.perf_counter()
+    for station_uuid in clicks:
+        server.record_station_click(station_uuid)
+    elapsed = time.perf_counter() - start
+
+    windows = len(server.trending_trackers)
+    tracker = server.trending_trackers["24h"]
+    print(f"{events} clicks over {stations} stations in {elapsed:.2f}s")
+    print(f"{events / elapsed:,.0f} clicks/sec ({windows} windows each)")
+    print(f"{events * windows / elapsed:,.0f} events/sec per window")
+    print(f"Sketch size per window: {len(tracker.table) * tracker.table.itemsize / 1024:.0f} KiB, top-k entries: "
+          f"{len(tracker.top) + sum(len(top) for top in tracker.country_top.values())}")
+    print(f"Top 5: {[station_uuid for station_uuid, _ in tracker.trending(5)]}")
+
+
+if __name__ == "__main__":
+    main()
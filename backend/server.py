@@ -1,14 +1,23 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 import os
+import asyncio
 import logging
+import time
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List, Optional
 import uuid
+import math
+from array import array
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime
 import httpx
+import ipaddress
+import numpy as np
 
 
 # Configure logging
@@ -29,6 +38,49 @@ RADIO_API_SERVERS = [
     "https://fr1.api.radio-browser.info"
 ]
 
+# Stream relay settings - the relay is opt-in, bandwidth caps of 0 mean unlimited
+STREAM_RELAY_ENABLED = os.environ.get("STREAM_RELAY_ENABLED", "false").lower() == "true"
+STREAM_RELAY_BUFFER_BYTES = int(os.environ.get("STREAM_RELAY_BUFFER_BYTES", 1024 * 1024))
+STREAM_RELAY_STATION_KBPS = int(os.environ.get("STREAM_RELAY_STATION_KBPS", 0))
+STREAM_RELAY_GLOBAL_KBPS = int(os.environ.get("STREAM_RELAY_GLOBAL_KBPS", 0))
+STREAM_RELAY_CHUNK_BYTES = 16 * 1024
+STREAM_RELAY_MAX_SKIPS = 3
+STREAM_RELAY_MAX_REDIRECTS = 5
+STREAM_RELAY_DEFAULT_KBPS = 128
+STREAM_RELAY_IDLE_SECONDS = 10.0
+
+# Similar stations - catalog warm-up size and how much each signal contributes to the score
+SIMILAR_CATALOG_LIMIT = int(os.environ.get("SIMILAR_CATALOG_LIMIT", 10000))
+SIMILAR_CATALOG_RETRY_SECONDS = 300
+SIMILAR_TAG_WEIGHT = 0.7
+SIMILAR_COUNTRY_WEIGHT = 0.1
+SIMILAR_LANGUAGE_WEIGHT = 0.1
+SIMILAR_VOTES_WEIGHT = 0.1
+
+# Trending stations - decay half-life in seconds for each supported window
+TRENDING_WINDOWS = {"1h": 3600, "24h": 86400, "7d": 7 * 86400}
+TRENDING_SKETCH_WIDTH = 4096
+TRENDING_SKETCH_DEPTH = 4
+TRENDING_TOP_K = 100
+TRENDING_COUNTRY_TOP_K = 20
+TRENDING_MAX_COUNTRIES = 300
+# Click throttling - one counted click per client and station per dedupe window,
+# and at most a few counted clicks per client per minute
+TRENDING_CLICK_DEDUPE_SECONDS = 3600
+TRENDING_CLICKS_PER_MINUTE = 10
+TRENDING_THROTTLE_MAX_ENTRIES = 100000
+
+# Proxies (IPs or networks) whose X-Forwarded-For / X-Real-IP headers are trusted
+# when working out a client's address; private networks cover Render, nginx and docker
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(network.strip(), strict=False)
+    for network in os.environ.get(
+        "TRUSTED_PROXIES",
+        "127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,fc00::/7"
+    ).split(",")
+    if network.strip()
+]
+
 def get_sample_radio_data(endpoint: str) -> list:
     """Return comprehensive sample data when all API servers fail"""
     if "topvote" in endpoint or "stations" in endpoint:
@@ -274,6 +326,13 @@ def get_sample_radio_data(endpoint: str) -> list:
         ]
     return []
 
+def is_sample_station(station: dict) -> bool:
+    return station.get("stationuuid", "").startswith("sample-uuid")
+
+def is_sample_data(stations: list) -> bool:
+    """True if a station list is the offline fallback rather than real API data"""
+    return bool(stations) and is_sample_station(stations[0])
+
 async def try_radio_api_request(endpoint: str, params: dict = None):
     """Try multiple Radio Browser API servers with improved error handling"""
     
@@ -323,8 +382,622 @@ async def try_radio_api_request(endpoint: str, params: dict = None):
     logger.error("All Radio Browser API servers failed, returning comprehensive sample data")
     return get_sample_radio_data(endpoint)
 
+async def get_station_by_uuid(station_uuid: str) -> Optional[dict]:
+    """Look up a single station by its uuid"""
+    for server in RADIO_API_SERVERS:
+        try:
+            async with httpx.AsyncClient(timeout=8.0) as client:
+                response = await client.get(
+                    f"{server}/json/stations/byuuid/{station_uuid}",
+                    headers={"User-Agent": "GlobalRadioApp/1.0"}
+                )
+                if response.status_code == 200:
+                    # An empty result means the station doesn't exist - asking the
+                    # other servers would only multiply the cost of junk uuids
+                    for station in response.json():
+                        if station.get("stationuuid") == station_uuid:
+                            return station
+                    return None
+        except Exception as e:
+            logger.warning(f"Failed to look up station {station_uuid} on {server}: {e}")
+            continue
+
+    # All servers are unreachable, so only the sample stations can be found
+    for station in get_sample_radio_data("/json/stations"):
+        if station.get("stationuuid") == station_uuid:
+            return station
+    return None
+
+async def resolve_public_address(url: str) -> Optional[str]:
+    """Resolve an http(s) url's host, returning an address only if all of them are public"""
+    try:
+        parsed = httpx.URL(url)
+    except Exception:
+        return None
+    if parsed.scheme not in ("http", "https") or not parsed.host:
+        return None
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(parsed.host, port)
+    except OSError:
+        return None
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            return None
+    return infos[0][4][0].split("%")[0] if infos else None
+
+def is_relayable_content_type(content_type: str) -> bool:
+    """True for audio formats a listener can start playing mid-stream.
+
+    Listeners join at the live edge, so Ogg (Vorbis/Opus) is refused: it can't
+    be decoded without the header pages sent at the start of the stream.
+    """
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in ("audio/ogg", "audio/opus", "audio/vorbis", "application/ogg"):
+        return False
+    return media_type.startswith("audio/")
+
+class StreamRingBuffer:
+    """Fixed-size byte ring shared by every listener of a relayed station.
+
+    Positions are absolute byte offsets, so a listener cursor is just an int.
+    Reads hand out memoryview slices of the ring - listeners never copy data.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._waiter: Optional[asyncio.Future] = None
+        self.write_pos = 0
+        self.closed = False
+
+    def write(self, data: bytes):
+        """Append a chunk, overwriting the oldest bytes once the ring is full"""
+        size = len(data)
+        chunk = memoryview(data)
+        if size > self.capacity:
+            chunk = chunk[size - self.capacity:]
+        start = (self.write_pos + size - len(chunk)) % self.capacity
+        head = min(len(chunk), self.capacity - start)
+        self._view[start:start + head] = chunk[:head]
+        if head < len(chunk):
+            self._view[:len(chunk) - head] = chunk[head:]
+        self.write_pos += size
+        self._wake()
+
+    def read(self, cursor: int, limit: int) -> memoryview:
+        """Return the contiguous bytes available at cursor (empty if caught up)"""
+        start = cursor % self.capacity
+        size = min(self.write_pos - cursor, self.capacity - start, limit)
+        return self._view[start:start + size]
+
+    def overrun(self, cursor: int) -> bool:
+        """True when the bytes at cursor have already been overwritten"""
+        return self.write_pos - cursor > self.capacity
+
+    async def wait(self):
+        """Wait until more data is written or the ring is closed"""
+        if self._waiter is None:
+            self._waiter = asyncio.get_running_loop().create_future()
+        # Shield so a disconnecting listener doesn't cancel the shared future
+        await asyncio.shield(self._waiter)
+
+    def close(self):
+        self.closed = True
+        self._wake()
+
+    def _wake(self):
+        if self._waiter is not None:
+            if not self._waiter.done():
+                self._waiter.set_result(None)
+            self._waiter = None
+
+class TokenBucket:
+    """Byte rate limiter shared by concurrent consumers (rate 0 disables it)"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    async def consume(self, amount: int):
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= amount
+        # Consumers that overdraw the bucket sleep off their share of the debt
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+# kbps -> bytes per second
+global_relay_bucket = TokenBucket(STREAM_RELAY_GLOBAL_KBPS * 125)
+
+class StationRelay:
+    """A single upstream connection for a station, fanned out to many listeners"""
+
+    def __init__(self, station_uuid: str, url: str, bitrate: int = STREAM_RELAY_DEFAULT_KBPS):
+        self.station_uuid = station_uuid
+        self.url = url
+        # Advertised kbps, used to budget listeners against the bandwidth caps
+        self.bitrate = bitrate or STREAM_RELAY_DEFAULT_KBPS
+        self.ring = StreamRingBuffer(STREAM_RELAY_BUFFER_BYTES)
+        self.bucket = TokenBucket(STREAM_RELAY_STATION_KBPS * 125)
+        self.content_type = "audio/mpeg"
+        self.listeners = 0
+        self.idle_since = time.monotonic()
+        self.ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._pump())
+
+    async def _connect(self, client: httpx.AsyncClient) -> Optional[httpx.Response]:
+        """Open the upstream stream, following redirects only to public hosts"""
+        url = self.url
+        for _ in range(STREAM_RELAY_MAX_REDIRECTS + 1):
+            # Station urls are user-editable upstream, so never let them reach internal hosts
+            address = await resolve_public_address(url)
+            if address is None:
+                logger.warning(f"Relay upstream for {self.station_uuid} points at a non-public host: {url}")
+                return None
+            # Connect to the address we just checked rather than letting httpx resolve the
+            # name again, which a rebinding DNS server could answer with an internal address
+            target = httpx.URL(url)
+            request = client.build_request(
+                "GET",
+                target.copy_with(host=address),
+                headers={"User-Agent": "GlobalRadioApp/1.0", "Host": target.netloc.decode("ascii")},
+                extensions={"sni_hostname": target.host} if target.scheme == "https" else {}
+            )
+            response = await client.send(request, stream=True)
+            if not response.is_redirect:
+                return response
+            url = str(target.join(response.headers["location"]))
+            await response.aclose()
+        logger.warning(f"Relay upstream for {self.station_uuid} redirected too many times")
+        return None
+
+    async def _pump(self):
+        """Read the upstream stream into the ring until it ends or goes idle"""
+        try:
+            # trust_env=False so environment proxy settings can't route around the address pinning
+            async with httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=30.0), trust_env=False) as client:
+                response = await self._connect(client)
+                if response is None:
+                    return
+                try:
+                    if response.status_code != 200:
+                        logger.warning(f"Relay upstream for {self.station_uuid} returned {response.status_code}")
+                        return
+                    content_type = response.headers.get("content-type", self.content_type)
+                    if not is_relayable_content_type(content_type):
+                        logger.warning(f"Relay upstream for {self.station_uuid} is not relayable audio: {content_type}")
+                        return
+                    self.content_type = content_type
+                    self.ready.set_result(True)
+                    logger.info(f"Relay started for {self.station_uuid}")
+                    async for chunk in response.aiter_raw(STREAM_RELAY_CHUNK_BYTES):
+                        self.ring.write(chunk)
+                        if self.listeners == 0 and time.monotonic() - self.idle_since > STREAM_RELAY_IDLE_SECONDS:
+                            break
+                finally:
+                    await response.aclose()
+        except Exception as e:
+            logger.warning(f"Relay upstream for {self.station_uuid} failed: {e}")
+        finally:
+            if not self.ready.done():
+                self.ready.set_result(False)
+            self.ring.close()
+            if stream_relays.get(self.station_uuid) is self:
+                del stream_relays[self.station_uuid]
+            logger.info(f"Relay stopped for {self.station_uuid}")
+
+    async def listen(self):
+        """Yield chunks for one listener, skipping ahead or dropping it when too slow.
+
+        The first item is an empty chunk: priming the generator registers the
+        listener immediately, so admission checks see it before anything awaits.
+        """
+        ring = self.ring
+        cursor = ring.write_pos
+        skips = 0
+        # Bytes delivered since the last skip; a full ring's worth forgives past skips
+        streak = 0
+        self.listeners += 1
+        try:
+            yield b""
+            while True:
+                if ring.overrun(cursor):
+                    skips += 1
+                    if skips > STREAM_RELAY_MAX_SKIPS:
+                        logger.info(f"Dropping slow relay listener for {self.station_uuid}")
+                        return
+                    cursor = ring.write_pos
+                    streak = 0
+                    continue
+                chunk = ring.read(cursor, STREAM_RELAY_CHUNK_BYTES)
+                if not chunk:
+                    if ring.closed:
+                        return
+                    await ring.wait()
+                    continue
+                # Admission keeps listeners within the caps; the buckets are only a backstop
+                await self.bucket.consume(len(chunk))
+                await global_relay_bucket.consume(len(chunk))
+                # The slice may have been overwritten while we were throttled
+                if ring.overrun(cursor):
+                    continue
+                cursor += len(chunk)
+                streak += len(chunk)
+                if streak >= ring.capacity:
+                    skips = 0
+                yield chunk
+        finally:
+            self.listeners -= 1
+            if self.listeners == 0:
+                self.idle_since = time.monotonic()
+
+# Active relays keyed by station uuid
+stream_relays: dict = {}
+
+def get_running_relay(station_uuid: str) -> Optional[StationRelay]:
+    relay = stream_relays.get(station_uuid)
+    if relay is None or relay.ring.closed:
+        return None
+    return relay
+
+def start_stream_relay(station_uuid: str, url: str, bitrate: int) -> StationRelay:
+    """Start a relay for a station, unless one started while we were looking it up"""
+    relay = get_running_relay(station_uuid)
+    if relay is None:
+        relay = StationRelay(station_uuid, url, bitrate)
+        stream_relays[station_uuid] = relay
+    return relay
+
+def relay_has_capacity(relay: StationRelay) -> bool:
+    """True if one more listener fits within the per-station and global kbps caps"""
+    if STREAM_RELAY_STATION_KBPS and (relay.listeners + 1) * relay.bitrate > STREAM_RELAY_STATION_KBPS:
+        return False
+    if STREAM_RELAY_GLOBAL_KBPS:
+        used = sum(r.listeners * r.bitrate for r in stream_relays.values())
+        if used + relay.bitrate > STREAM_RELAY_GLOBAL_KBPS:
+            return False
+    return True
+
+def _grow(array: np.ndarray, size: int) -> np.ndarray:
+    """Return array with room for at least size items (amortized doubling)"""
+    if size <= len(array):
+        return array
+    grown = np.zeros(max(size, len(array) * 2), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+class StationSimilarityIndex:
+    """TF-IDF tag vectors for every station we've seen, for "similar stations".
+
+    Tags are kept as a sparse COO matrix in flat NumPy arrays (one entry per
+    station/tag pair). New stations append rows in place, and a station whose
+    tags change has its old entries tombstoned and new ones appended. IDF
+    weights and row norms are recomputed lazily in one vectorized pass when the
+    catalog changed, which is also when tombstones are compacted away.
+    """
+
+    def __init__(self):
+        self.uuids: List[str] = []
+        self.stations: List[dict] = []
+        self.tags: List[List[str]] = []
+        self.positions: dict = {}
+        self.terms: dict = {}
+        self._countries: dict = {}
+        self._languages: dict = {}
+        self._rows = np.zeros(1024, dtype=np.int32)
+        self._cols = np.zeros(1024, dtype=np.int32)
+        self._alive = np.ones(1024, dtype=bool)
+        self._nnz = 0
+        self._dead = 0
+        self._country = np.zeros(256, dtype=np.int32)
+        self._language = np.zeros(256, dtype=np.int32)
+        self._votes = np.zeros(256, dtype=np.float64)
+        self._idf: Optional[np.ndarray] = None
+        self._norms: Optional[np.ndarray] = None
+
+    def __len__(self):
+        return len(self.uuids)
+
+    @staticmethod
+    def _tokens(value: Optional[str]) -> List[str]:
+        return sorted({tag.strip().lower() for tag in (value or "").split(",") if tag.strip()})
+
+    @staticmethod
+    def _code(codes: dict, value: Optional[str]) -> int:
+        # 0 means unknown, so two stations with no country don't count as a match
+        value = (value or "").strip().lower()
+        if not value:
+            return 0
+        return codes.setdefault(value, len(codes) + 1)
+
+    def add_stations(self, stations: list):
+        """Add unseen stations to the index and refresh metadata of known ones"""
+        for station in stations:
+            station_uuid = station.get("stationuuid")
+            if not station_uuid:
+                continue
+            tags = self._tokens(station.get("tags"))
+            row = self.positions.get(station_uuid)
+            if row is None:
+                row = len(self.uuids)
+                self.positions[station_uuid] = row
+                self.uuids.append(station_uuid)
+                self.stations.append(station)
+                self.tags.append(tags)
+                self._append_tags(row, tags)
+                self._country = _grow(self._country, row + 1)
+                self._language = _grow(self._language, row + 1)
+                self._votes = _grow(self._votes, row + 1)
+            else:
+                self.stations[row] = station
+                if tags != self.tags[row]:
+                    stale = (self._rows[:self._nnz] == row) & self._alive[:self._nnz]
+                    self._alive[:self._nnz][stale] = False
+                    self._dead += int(stale.sum())
+                    self.tags[row] = tags
+                    self._append_tags(row, tags)
+            self._country[row] = self._code(self._countries, station.get("country"))
+            self._language[row] = self._code(self._languages, station.get("language"))
+            self._votes[row] = max(station.get("votes") or 0, 0)
+
+    def _append_tags(self, row: int, tags: List[str]):
+        cols = [self.terms.setdefault(tag, len(self.terms)) for tag in tags]
+        end = self._nnz + len(cols)
+        self._rows = _grow(self._rows, end)
+        self._cols = _grow(self._cols, end)
+        self._alive = _grow(self._alive, end)
+        self._rows[self._nnz:end] = row
+        self._cols[self._nnz:end] = cols
+        self._alive[self._nnz:end] = True
+        self._nnz = end
+        self._idf = None
+
+    def _compact(self):
+        """Drop tombstoned entries so the COO arrays only hold live tags"""
+        keep = self._alive[:self._nnz]
+        live = self._nnz - self._dead
+        self._rows[:live] = self._rows[:self._nnz][keep]
+        self._cols[:live] = self._cols[:self._nnz][keep]
+        self._alive[:live] = True
+        self._nnz = live
+        self._dead = 0
+
+    def _weights(self):
+        """Rebuild IDF weights and row norms if the catalog changed since last query"""
+        if self._idf is None:
+            if self._dead:
+                self._compact()
+            rows = self._rows[:self._nnz]
+            cols = self._cols[:self._nnz]
+            df = np.bincount(cols, minlength=len(self.terms))
+            self._idf = np.log((1 + len(self)) / (1 + df)) + 1.0
+            self._norms = np.sqrt(np.bincount(rows, weights=self._idf[cols] ** 2, minlength=len(self)))
+        return self._idf, self._norms
+
+    def similar(self, station_uuid: str, limit: int = 10) -> list:
+        """Top stations by blended tag cosine, country, language and votes"""
+        row = self.positions.get(station_uuid)
+        if row is None or len(self) < 2 or limit < 1:
+            return []
+        idf, norms = self._weights()
+        count = len(self)
+        rows = self._rows[:self._nnz]
+        cols = self._cols[:self._nnz]
+
+        # Cosine similarity against every station at once: only entries sharing a
+        # tag with the query contribute to the dot product
+        query = cols[rows == row]
+        query_weights = np.zeros(len(self.terms))
+        query_weights[query] = idf[query]
+        shared = np.isin(cols, query)
+        dots = np.bincount(rows[shared], weights=idf[cols[shared]] * query_weights[cols[shared]], minlength=count)
+        denominator = norms * norms[row]
+        tag_scores = np.divide(dots, denominator, out=np.zeros(count), where=denominator > 0)
+
+        country = self._country[:count]
+        language = self._language[:count]
+        votes = np.log1p(self._votes[:count])
+        scores = SIMILAR_TAG_WEIGHT * tag_scores
+        scores += SIMILAR_COUNTRY_WEIGHT * ((country == country[row]) & (country > 0))
+        scores += SIMILAR_LANGUAGE_WEIGHT * ((language == language[row]) & (language > 0))
+        if votes.max() > 0:
+            scores += SIMILAR_VOTES_WEIGHT * votes / votes.max()
+        scores[row] = -np.inf
+
+        limit = min(limit, count - 1)
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [self.stations[i] for i in top]
+
+similarity_index = StationSimilarityIndex()
+
+class TrendingTracker:
+    """Exponentially decayed click counts with constant memory.
+
+    Counts live in a count-min sketch, with top-k heavy hitters kept globally and
+    per country. Decay uses forward weighting: each click adds exp(rate * age of
+    tracker), so stored counts never need touching until the weight gets large
+    and everything is rescaled at once. Scores are divided back down on read.
+    """
+
+    _PRIME = (1 << 61) - 1
+
+    def __init__(self, half_life: float):
+        self.rate = math.log(2) / half_life
+        self.start = time.monotonic()
+        # Flat depth x width table; a typed array keeps scalar updates cheap
+        self.table = array("d", bytes(8 * TRENDING_SKETCH_DEPTH * TRENDING_SKETCH_WIDTH))
+        rng = np.random.default_rng()
+        self._hash_params = [
+            (int(a), int(b), row * TRENDING_SKETCH_WIDTH)
+            for row, (a, b) in enumerate(rng.integers(1, self._PRIME, size=(TRENDING_SKETCH_DEPTH, 2)))
+        ]
+        self.top: dict = {}
+        self.country_top: dict = {}
+
+    def _estimate_add(self, key: str, weight: float) -> float:
+        """Add weight to key in the sketch and return its new count estimate"""
+        h = hash(key)
+        table = self.table
+        estimate = math.inf
+        for a, b, offset in self._hash_params:
+            index = offset + (a * h + b) % self._PRIME % TRENDING_SKETCH_WIDTH
+            table[index] += weight
+            estimate = min(estimate, table[index])
+        return estimate
+
+    @staticmethod
+    def _offer(top: dict, key: str, count: float, k: int):
+        """Keep key in the top-k dict if its count beats the current minimum"""
+        if key in top or len(top) < k:
+            top[key] = count
+            return
+        weakest = min(top, key=top.get)
+        if count > top[weakest]:
+            del top[weakest]
+            top[key] = count
+
+    def _rescale(self, now: float):
+        factor = math.exp(-self.rate * (now - self.start))
+        self.table = array("d", (count * factor for count in self.table))
+        for top in [self.top, *self.country_top.values()]:
+            for key in top:
+                top[key] *= factor
+        self.start = now
+
+    def record(self, station_uuid: str, country: Optional[str] = None, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        if self.rate * (now - self.start) > 500:
+            self._rescale(now)
+        weight = math.exp(self.rate * (now - self.start))
+        self._offer(self.top, station_uuid, self._estimate_add(station_uuid, weight), TRENDING_TOP_K)
+        if country:
+            country = country.lower()
+            top = self.country_top.get(country)
+            if top is None and len(self.country_top) < TRENDING_MAX_COUNTRIES:
+                top = self.country_top[country] = {}
+            if top is not None:
+                count = self._estimate_add(f"{country}\x00{station_uuid}", weight)
+                self._offer(top, station_uuid, count, TRENDING_COUNTRY_TOP_K)
+
+    def trending(self, limit: int, country: Optional[str] = None, now: Optional[float] = None) -> list:
+        """Return (station_uuid, decayed clicks) pairs, highest first"""
+        now = time.monotonic() if now is None else now
+        top = self.country_top.get(country.lower(), {}) if country else self.top
+        scale = math.exp(-self.rate * (now - self.start))
+        ranked = sorted(top.items(), key=lambda item: item[1], reverse=True)[:limit]
+        # Stations that have decayed to nothing stay in top-k until evicted; hide them
+        return [(station_uuid, count * scale) for station_uuid, count in ranked if count * scale >= 0.01]
+
+def is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+def client_address(request: Request) -> str:
+    """The client's address, looking through forwarding headers set by trusted proxies"""
+    peer = request.client.host if request.client else "unknown"
+    if not is_trusted_proxy(peer):
+        return peer
+    hops = [
+        hop.strip()
+        for header in request.headers.getlist("x-forwarded-for")
+        for hop in header.split(",")
+        if hop.strip()
+    ]
+    if not hops and request.headers.get("x-real-ip"):
+        hops = [request.headers["x-real-ip"].strip()]
+    # Walk back from the nearest hop; the first untrusted address is the real client,
+    # anything to its left was supplied by the client itself
+    for hop in reversed(hops):
+        if not is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+class ClickThrottle:
+    """Decide which clicks count towards trending, per client address.
+
+    Like radio-browser, a client's repeated clicks on a station only count once
+    per dedupe window, and each client gets a small per-minute budget. Both maps
+    are kept in insertion order so expired and excess entries fall off the front.
+    """
+
+    def __init__(self):
+        self._seen: OrderedDict = OrderedDict()
+        self._recent: OrderedDict = OrderedDict()
+
+    @staticmethod
+    def _expire(entries: OrderedDict, older_than: float):
+        while entries and (next(iter(entries.values()))[0] < older_than
+                           or len(entries) > TRENDING_THROTTLE_MAX_ENTRIES):
+            entries.popitem(last=False)
+
+    def allow(self, client: str, station_uuid: str, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        self._expire(self._seen, now - TRENDING_CLICK_DEDUPE_SECONDS)
+        self._expire(self._recent, now - 60)
+        key = (client, station_uuid)
+        if key in self._seen:
+            return False
+        started, count = self._recent.get(client, (now, 0))
+        if count >= TRENDING_CLICKS_PER_MINUTE:
+            return False
+        self._seen[key] = (now,)
+        self._recent[client] = (started, count + 1)
+        return True
+
+trending_trackers = {window: TrendingTracker(half_life) for window, half_life in TRENDING_WINDOWS.items()}
+click_throttle = ClickThrottle()
+
+def record_station_click(station_uuid: str) -> bool:
+    """Feed a click into every trending window, ignoring stations we don't know"""
+    row = similarity_index.positions.get(station_uuid)
+    if row is None:
+        return False
+    country = similarity_index.stations[row].get("country")
+    now = time.monotonic()
+    for tracker in trending_trackers.values():
+        tracker.record(station_uuid, country, now)
+    return True
+
+# Sample stations are only ever compared with each other, never mixed into the real index
+sample_similarity_index = StationSimilarityIndex()
+sample_similarity_index.add_stations(get_sample_radio_data("/json/stations"))
+
+async def load_similarity_catalog():
+    """Warm the similarity index with the most voted stations, retrying while the API is down"""
+    while True:
+        try:
+            stations = await try_radio_api_request(
+                "/json/stations/topvote",
+                params={"limit": SIMILAR_CATALOG_LIMIT, "hidebroken": "true"}
+            )
+            if not is_sample_data(stations):
+                similarity_index.add_stations(stations)
+                logger.info(f"Similarity index loaded with {len(similarity_index)} stations")
+                return
+            logger.warning(f"Radio Browser API unavailable, retrying similarity catalog in {SIMILAR_CATALOG_RETRY_SECONDS}s")
+        except Exception as e:
+            logger.warning(f"Failed to load similarity catalog: {e}")
+        await asyncio.sleep(SIMILAR_CATALOG_RETRY_SECONDS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    catalog_task = asyncio.create_task(load_similarity_catalog())
+    yield
+    catalog_task.cancel()
+
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -360,6 +1033,8 @@ async def get_popular_stations(limit: int = 100):
             "/json/stations/topvote",
             params={"limit": limit, "hidebroken": "true"}
         )
+        if not is_sample_data(result):
+            similarity_index.add_stations(result)
         return result
     except Exception as e:
         logger.error(f"Error fetching popular stations: {e}")
@@ -385,7 +1060,7 @@ async def search_stations(
         )
         
         # If we got sample data, perform local filtering
-        if result and len(result) > 0 and result[0].get("stationuuid", "").startswith("sample-uuid"):
+        if is_sample_data(result):
             filtered_result = []
             for station in result:
                 match = True
@@ -403,11 +1078,55 @@ async def search_stations(
             
             return filtered_result[:limit]
         
+        similarity_index.add_stations(result)
         return result
     except Exception as e:
         logger.error(f"Error searching stations: {e}")
         raise HTTPException(status_code=500, detail="Failed to search stations")
 
+@api_router.get("/radio/stations/trending")
+async def get_trending_stations(
+    window: str = "24h",
+    country: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Get stations our own users are playing the most, decayed over the window"""
+    tracker = trending_trackers.get(window)
+    if tracker is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown window, expected one of: {', '.join(TRENDING_WINDOWS)}"
+        )
+    try:
+        result = []
+        for station_uuid, score in tracker.trending(TRENDING_TOP_K, country):
+            row = similarity_index.positions.get(station_uuid)
+            if row is None:
+                continue
+            result.append({**similarity_index.stations[row], "trending_score": round(score, 2)})
+        return result[:limit]
+    except Exception as e:
+        logger.error(f"Error fetching trending stations: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch trending stations")
+
+@api_router.get("/radio/stations/{station_uuid}/similar")
+async def get_similar_stations(station_uuid: str, limit: int = Query(10, ge=1, le=100)):
+    """Get stations similar to the given one by tags, country, language and votes"""
+    try:
+        if station_uuid in sample_similarity_index.positions:
+            return sample_similarity_index.similar(station_uuid, limit)
+        if station_uuid not in similarity_index.positions:
+            station = await get_station_by_uuid(station_uuid)
+            if not station:
+                raise HTTPException(status_code=404, detail="Station not found")
+            similarity_index.add_stations([station])
+        return similarity_index.similar(station_uuid, limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching similar stations for {station_uuid}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch similar stations")
+
 @api_router.get("/radio/countries")
 async def get_countries():
     """Get list of countries with radio stations"""
@@ -422,9 +1141,18 @@ async def get_countries():
         raise HTTPException(status_code=500, detail="Failed to fetch countries")
 
 @api_router.post("/radio/stations/{station_uuid}/click")
-async def register_station_click(station_uuid: str):
+async def register_station_click(station_uuid: str, request: Request):
     """Register a click for a radio station"""
     try:
+        # Throttle before the lookup so junk uuids can't be used to spam radio-browser either
+        client = client_address(request)
+        if click_throttle.allow(client, station_uuid):
+            if station_uuid not in similarity_index.positions:
+                station = await get_station_by_uuid(station_uuid)
+                if station and not is_sample_station(station):
+                    similarity_index.add_stations([station])
+            record_station_click(station_uuid)
+
         # Try to register with actual API servers
         for server in RADIO_API_SERVERS:
             try:
@@ -445,6 +1173,45 @@ async def register_station_click(station_uuid: str):
         logger.warning(f"Error registering click for {station_uuid}: {e}")
         return {"success": False}
 
+@api_router.get("/radio/stream/{station_uuid}")
+async def relay_station_stream(station_uuid: str):
+    """Relay a station's audio through the backend (for http:// streams on https pages)"""
+    if not STREAM_RELAY_ENABLED:
+        raise HTTPException(status_code=404, detail="Stream relay is disabled")
+    try:
+        # Only look the station up when there isn't already a relay to join
+        relay = get_running_relay(station_uuid)
+        if relay is None:
+            station = await get_station_by_uuid(station_uuid)
+            if not station:
+                raise HTTPException(status_code=404, detail="Station not found")
+
+            url = station.get("url_resolved") or station.get("url") or ""
+            if not url.startswith(("http://", "https://")):
+                raise HTTPException(status_code=400, detail="Station has no relayable stream URL")
+
+            relay = start_stream_relay(station_uuid, url, station.get("bitrate") or 0)
+
+        if not await asyncio.wait_for(asyncio.shield(relay.ready), timeout=15.0):
+            raise HTTPException(status_code=502, detail="Station stream is unavailable")
+
+        # Turn listeners away up front rather than letting everyone fall behind the caps
+        if not relay_has_capacity(relay):
+            raise HTTPException(status_code=503, detail="Stream relay is at capacity")
+        stream = relay.listen()
+        await stream.__anext__()
+
+        return StreamingResponse(
+            stream,
+            media_type=relay.content_type,
+            headers={"Cache-Control": "no-store", "X-Content-Type-Options": "nosniff"}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error relaying stream for {station_uuid}: {e}")
+        raise HTTPException(status_code=502, detail="Failed to relay stream")
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -3,6 +3,7 @@ import './App.css';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+const STREAM_RELAY = process.env.REACT_APP_STREAM_RELAY === 'true';
 
 function App() {
   const [stations, setStations] = useState([]);
@@ -228,7 +229,11 @@ function App() {
       }
 
       // Set the audio source
-      const audioUrl = station.url_resolved || station.url;
+      let audioUrl = station.url_resolved || station.url;
+      // Plain http streams are blocked as mixed content on https pages, so play them through the backend relay
+      if (STREAM_RELAY && window.location.protocol === 'https:' && audioUrl.startsWith('http://')) {
+        audioUrl = `${API}/radio/stream/${station.stationuuid}`;
+      }
       console.log('Setting audio source to:', audioUrl);
       audioRef.current.src = audioUrl;
       
@@ -0,0 +1,157 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+
+def sample_index():
+    index = server.StationSimilarityIndex()
+    index.add_stations(server.get_sample_radio_data("/json/stations/topvote"))
+    return index
+
+
+def names(stations):
+    return [station["name"] for station in stations]
+
+
+def test_similar_ranks_shared_tags_and_country_first():
+    index = sample_index()
+    similar = index.similar("sample-uuid-7", limit=3)
+    # Jazz FM: Radio Swiss Pop shares "music" and Switzerland, Smooth Jazz shares "jazz"
+    assert names(similar)[:2] == ["Radio Swiss Pop", "Smooth Jazz"]
+    assert "sample-uuid-7" not in [station["stationuuid"] for station in similar]
+
+
+def test_similar_prefers_full_tag_overlap():
+    index = sample_index()
+    # BBC World Service is tagged news,talk,english - same as NPR News
+    assert names(index.similar("sample-uuid-1", limit=1)) == ["NPR News"]
+
+
+def test_similar_limit_is_clamped():
+    index = sample_index()
+    assert index.similar("sample-uuid-1", limit=0) == []
+    assert index.similar("sample-uuid-1", limit=-20) == []
+    assert len(index.similar("sample-uuid-1", limit=500)) == len(index) - 1
+    assert index.similar("unknown-uuid") == []
+
+
+def test_changed_tags_replace_old_vector():
+    index = sample_index()
+    station = dict(index.stations[index.positions["sample-uuid-1"]], tags="jazz,smooth,instrumental")
+    index.add_stations([station])
+    assert names(index.similar("sample-uuid-1", limit=1)) == ["Smooth Jazz"]
+    # Old entries are compacted away once weights are rebuilt
+    assert index._dead == 0
+    assert index._nnz == sum(len(tags) for tags in index.tags)
+
+
+def test_unchanged_tags_do_not_invalidate_weights():
+    index = sample_index()
+    index.similar("sample-uuid-1")
+    index.add_stations(server.get_sample_radio_data("/json/stations/topvote"))
+    assert index._idf is not None
+
+
+def test_similar_endpoint_rejects_bad_limit():
+    client = TestClient(server.app)
+    assert client.get("/api/radio/stations/sample-uuid-1/similar?limit=-1").status_code == 422
+    assert client.get("/api/radio/stations/sample-uuid-1/similar?limit=101").status_code == 422
+
+
+def mock_radio_api(monkeypatch, handler):
+    """Route the backend's radio-browser requests to handler, recording them"""
+    requests = []
+    real_client = httpx.AsyncClient
+
+    def recorded(request):
+        requests.append(request)
+        return handler(request)
+
+    monkeypatch.setattr(
+        server.httpx, "AsyncClient",
+        lambda **kwargs: real_client(transport=httpx.MockTransport(recorded), **kwargs)
+    )
+    return requests
+
+
+def test_unknown_uuid_is_not_found_after_one_request(monkeypatch):
+    requests = mock_radio_api(monkeypatch, lambda request: httpx.Response(200, json=[]))
+    assert asyncio.run(server.get_station_by_uuid("junk")) is None
+    assert len(requests) == 1
+
+
+def test_station_lookup_tries_next_server_when_one_is_down(monkeypatch):
+    def handler(request):
+        if request.url.host == "de1.api.radio-browser.info":
+            raise httpx.ConnectError("down")
+        return httpx.Response(200, json=[{"stationuuid": "abc", "name": "Found"}])
+
+    requests = mock_radio_api(monkeypatch, handler)
+    assert asyncio.run(server.get_station_by_uuid("abc"))["name"] == "Found"
+    assert len(requests) == 2
+
+
+def test_station_lookup_falls_back_to_sample_data(monkeypatch):
+    def handler(request):
+        raise httpx.ConnectError("down")
+
+    mock_radio_api(monkeypatch, handler)
+    assert asyncio.run(server.get_station_by_uuid("sample-uuid-3"))["name"] == "NPR News"
+    assert asyncio.run(server.get_station_by_uuid("junk")) is None
+
+
+@pytest.fixture
+def fresh_index(monkeypatch):
+    index = server.StationSimilarityIndex()
+    monkeypatch.setattr(server, "similarity_index", index)
+    return index
+
+
+def fake_api(monkeypatch, responses):
+    """Make try_radio_api_request return each response in turn (repeating the last)"""
+    calls = []
+
+    async def request(endpoint, params=None):
+        calls.append(endpoint)
+        return responses[min(len(calls), len(responses)) - 1]
+
+    monkeypatch.setattr(server, "try_radio_api_request", request)
+    return calls
+
+
+REAL_STATIONS = [
+    {"stationuuid": "real-1", "name": "Real Jazz", "tags": "jazz", "country": "France"},
+    {"stationuuid": "real-2", "name": "Real Smooth Jazz", "tags": "jazz,smooth", "country": "France"},
+]
+
+
+def test_fallback_data_is_not_indexed(monkeypatch, fresh_index):
+    fake_api(monkeypatch, [server.get_sample_radio_data("/json/stations")])
+    client = TestClient(server.app)
+    assert len(client.get("/api/radio/stations/popular").json()) == 20
+    client.get("/api/radio/stations/search?name=jazz")
+    assert len(fresh_index) == 0
+
+
+def test_real_data_is_indexed(monkeypatch, fresh_index):
+    fake_api(monkeypatch, [REAL_STATIONS])
+    TestClient(server.app).get("/api/radio/stations/search?name=jazz")
+    assert set(fresh_index.positions) == {"real-1", "real-2"}
+
+
+def test_catalog_warm_up_retries_until_api_recovers(monkeypatch, fresh_index):
+    calls = fake_api(monkeypatch, [server.get_sample_radio_data("/json/stations"), REAL_STATIONS])
+    monkeypatch.setattr(server, "SIMILAR_CATALOG_RETRY_SECONDS", 0)
+    asyncio.run(server.load_similarity_catalog())
+    assert len(calls) == 2
+    assert set(fresh_index.positions) == {"real-1", "real-2"}
+
+
+def test_sample_stations_are_compared_among_themselves(fresh_index):
+    response = TestClient(server.app).get("/api/radio/stations/sample-uuid-1/similar?limit=1")
+    assert names(response.json()) == ["NPR News"]
+    assert len(fresh_index) == 0
@@ -0,0 +1,179 @@
+import asyncio
+
+import httpx
+import pytest
+
+import server
+
+
+def test_ring_write_wraps_around():
+    ring = server.StreamRingBuffer(10)
+    ring.write(b"abcdefg")
+    ring.write(b"hijkl")
+    assert ring.write_pos == 12
+    assert bytes(ring.read(7, 100)) == b"hij"
+    assert bytes(ring.read(10, 100)) == b"kl"
+    assert bytes(ring.read(12, 100)) == b""
+
+
+def test_ring_write_larger_than_buffer_keeps_tail():
+    ring = server.StreamRingBuffer(10)
+    ring.write(b"xyz")
+    ring.write(b"0123456789ABCDEF")
+    assert ring.write_pos == 19
+    cursor = ring.write_pos - ring.capacity
+    data = bytes(ring.read(cursor, 100)) + bytes(ring.read(cursor + len(ring.read(cursor, 100)), 100))
+    assert data == b"6789ABCDEF"
+
+
+def test_ring_overrun():
+    ring = server.StreamRingBuffer(10)
+    ring.write(b"a" * 12)
+    assert ring.overrun(0)
+    assert ring.overrun(1)
+    assert not ring.overrun(2)
+
+
+@pytest.fixture
+def relay(monkeypatch):
+    async def no_upstream(self):
+        self.ready.set_result(True)
+
+    monkeypatch.setattr(server, "STREAM_RELAY_BUFFER_BYTES", 64)
+    monkeypatch.setattr(server.StationRelay, "_pump", no_upstream)
+    return lambda: server.StationRelay("test-uuid", "http://example.com/stream")
+
+
+async def lag_then_read(stream, ring):
+    """Let the listener fall a full ring behind, then give it a fresh chunk"""
+    ring.write(b"x" * ring.capacity * 2)
+    task = asyncio.ensure_future(stream.__anext__())
+    await asyncio.sleep(0)
+    if not task.done():
+        ring.write(b"y" * 8)
+    return await task
+
+
+def test_slow_listener_skips_ahead_then_drops(relay):
+    async def scenario():
+        station = relay()
+        stream = station.listen()
+        assert await stream.__anext__() == b""
+        assert station.listeners == 1
+        for _ in range(server.STREAM_RELAY_MAX_SKIPS):
+            assert bytes(await lag_then_read(stream, station.ring)) == b"y" * 8
+        with pytest.raises(StopAsyncIteration):
+            await lag_then_read(stream, station.ring)
+        assert station.listeners == 0
+
+    asyncio.run(scenario())
+
+
+def test_listener_that_keeps_up_is_forgiven(relay):
+    async def scenario():
+        station = relay()
+        stream = station.listen()
+        await stream.__anext__()
+        for _ in range(server.STREAM_RELAY_MAX_SKIPS):
+            await lag_then_read(stream, station.ring)
+        # Keeping up for a full ring's worth of data resets the skip count
+        delivered = 0
+        while delivered < station.ring.capacity:
+            station.ring.write(b"z" * 16)
+            delivered += len(await stream.__anext__())
+        assert bytes(await lag_then_read(stream, station.ring)) == b"y" * 8
+        await stream.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_admission_respects_station_and_global_caps(relay, monkeypatch):
+    async def scenario():
+        station = relay()
+        monkeypatch.setattr(server, "stream_relays", {station.station_uuid: station})
+        monkeypatch.setattr(server, "STREAM_RELAY_STATION_KBPS", 256)
+        assert server.relay_has_capacity(station)
+        station.listeners = 2
+        assert not server.relay_has_capacity(station)
+
+        monkeypatch.setattr(server, "STREAM_RELAY_STATION_KBPS", 0)
+        monkeypatch.setattr(server, "STREAM_RELAY_GLOBAL_KBPS", 384)
+        assert server.relay_has_capacity(station)
+        station.listeners = 3
+        assert not server.relay_has_capacity(station)
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/stream",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://10.0.0.5:8000/stream",
+    "http://[::1]/stream",
+    "file:///etc/passwd",
+])
+def test_relay_rejects_non_public_urls(url):
+    assert asyncio.run(server.resolve_public_address(url)) is None
+
+
+def rebinding_dns(monkeypatch, answers):
+    """Make getaddrinfo hand out the given addresses in turn, like a rebinding DNS server"""
+    lookups = []
+
+    async def getaddrinfo(self, host, port, *args, **kwargs):
+        address = answers[min(len(lookups), len(answers) - 1)]
+        lookups.append(host)
+        return [(None, None, None, "", (address, port))]
+
+    monkeypatch.setattr(asyncio.BaseEventLoop, "getaddrinfo", getaddrinfo)
+    return lookups
+
+
+def test_relay_connects_to_the_address_it_validated(relay, monkeypatch):
+    lookups = rebinding_dns(monkeypatch, ["93.184.216.34", "127.0.0.1"])
+    seen = []
+
+    def upstream(request):
+        seen.append(request)
+        return httpx.Response(200, headers={"content-type": "audio/mpeg"})
+
+    async def scenario():
+        station = relay()
+        station.url = "https://radio.example.com/live"
+        async with httpx.AsyncClient(transport=httpx.MockTransport(upstream)) as client:
+            response = await station._connect(client)
+            await response.aclose()
+
+    asyncio.run(scenario())
+    # Only our own check resolved the name; the connection went to the validated address
+    assert lookups == ["radio.example.com"]
+    assert seen[0].url.host == "93.184.216.34"
+    assert seen[0].headers["host"] == "radio.example.com"
+    assert seen[0].extensions["sni_hostname"] == "radio.example.com"
+
+
+def test_relay_rechecks_redirect_targets(relay, monkeypatch):
+    rebinding_dns(monkeypatch, ["93.184.216.34", "169.254.169.254"])
+    seen = []
+
+    def upstream(request):
+        seen.append(request)
+        return httpx.Response(302, headers={"location": "http://metadata.example.com/"})
+
+    async def scenario():
+        station = relay()
+        station.url = "http://radio.example.com/live"
+        async with httpx.AsyncClient(transport=httpx.MockTransport(upstream)) as client:
+            return await station._connect(client)
+
+    assert asyncio.run(scenario()) is None
+    assert len(seen) == 1
+
+
+def test_relay_only_accepts_audio_that_can_start_mid_stream():
+    assert server.is_relayable_content_type("audio/mpeg")
+    assert server.is_relayable_content_type("audio/aac")
+    assert not server.is_relayable_content_type("text/html; charset=utf-8")
+    # Ogg can't be decoded without the header pages listeners miss when joining live
+    assert not server.is_relayable_content_type("application/ogg")
+    assert not server.is_relayable_content_type("audio/ogg; codecs=opus")
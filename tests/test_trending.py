@@ -0,0 +1,134 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+import server
+
+
+def test_counts_halve_every_half_life():
+    tracker = server.TrendingTracker(3600)
+    start = tracker.start
+    for _ in range(8):
+        tracker.record("a", now=start)
+    assert tracker.trending(1, now=start) == [("a", pytest.approx(8.0))]
+    assert tracker.trending(1, now=start + 3600) == [("a", pytest.approx(4.0))]
+    assert tracker.trending(1, now=start + 3 * 3600) == [("a", pytest.approx(1.0))]
+
+
+def test_recent_clicks_outrank_older_ones():
+    tracker = server.TrendingTracker(3600)
+    start = tracker.start
+    for _ in range(6):
+        tracker.record("old", now=start)
+    for _ in range(4):
+        tracker.record("new", now=start + 3600)
+    ranked = tracker.trending(2, now=start + 3600)
+    assert [station_uuid for station_uuid, _ in ranked] == ["new", "old"]
+    assert ranked[1][1] == pytest.approx(3.0)
+
+
+def test_rescale_preserves_decayed_counts():
+    tracker = server.TrendingTracker(3600)
+    start = tracker.start
+    for _ in range(4):
+        tracker.record("a", "UK", now=start)
+    tracker.record("a", "UK", now=start + 3600)
+    tracker._rescale(start + 3600)
+    assert tracker.start == start + 3600
+    assert tracker.trending(1, now=start + 7200) == [("a", pytest.approx(1.5))]
+    assert tracker.trending(1, "uk", now=start + 7200) == [("a", pytest.approx(1.5))]
+
+
+def test_long_gap_rescales_without_overflow():
+    tracker = server.TrendingTracker(3600)
+    start = tracker.start
+    tracker.record("a", now=start)
+    later = start + 3600 * 1000
+    tracker.record("b", now=later)
+    assert tracker.start == later
+    # "a" has decayed to nothing and is hidden
+    assert tracker.trending(5, now=later) == [("b", pytest.approx(1.0))]
+
+
+def test_country_breakdown():
+    tracker = server.TrendingTracker(3600)
+    start = tracker.start
+    tracker.record("a", "France", now=start)
+    tracker.record("b", "Germany", now=start)
+    tracker.record("b", "Germany", now=start)
+    assert [station_uuid for station_uuid, _ in tracker.trending(5, now=start)] == ["b", "a"]
+    assert [station_uuid for station_uuid, _ in tracker.trending(5, "france", now=start)] == ["a"]
+    assert tracker.trending(5, "Spain", now=start) == []
+
+
+def test_throttle_dedupes_clicks_per_client():
+    throttle = server.ClickThrottle()
+    assert throttle.allow("1.2.3.4", "a", now=0)
+    assert not throttle.allow("1.2.3.4", "a", now=10)
+    assert throttle.allow("5.6.7.8", "a", now=10)
+    assert throttle.allow("1.2.3.4", "a", now=server.TRENDING_CLICK_DEDUPE_SECONDS + 1)
+
+
+def test_throttle_limits_clicks_per_client_per_minute():
+    throttle = server.ClickThrottle()
+    for i in range(server.TRENDING_CLICKS_PER_MINUTE):
+        assert throttle.allow("9.9.9.9", f"s{i}", now=100)
+    assert not throttle.allow("9.9.9.9", "one-more", now=100)
+    assert throttle.allow("1.2.3.4", "one-more", now=100)
+    assert throttle.allow("9.9.9.9", "one-more", now=161)
+
+
+def make_request(peer, headers=()):
+    return Request({
+        "type": "http",
+        "client": (peer, 12345),
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+    })
+
+
+def test_client_address_uses_forwarded_headers_from_trusted_proxies():
+    assert server.client_address(make_request("10.0.0.2", [("x-forwarded-for", "203.0.113.7")])) == "203.0.113.7"
+    assert server.client_address(make_request("10.0.0.2", [("x-real-ip", "203.0.113.8")])) == "203.0.113.8"
+    # Spoofed entries to the left of the last untrusted hop are ignored
+    chain = "198.51.100.1, 203.0.113.7, 10.0.0.9"
+    assert server.client_address(make_request("10.0.0.2", [("x-forwarded-for", chain)])) == "203.0.113.7"
+    assert server.client_address(make_request("10.0.0.2")) == "10.0.0.2"
+
+
+def test_client_address_ignores_headers_from_untrusted_peers():
+    request = make_request("198.51.100.1", [("x-forwarded-for", "203.0.113.7")])
+    assert server.client_address(request) == "198.51.100.1"
+
+
+@pytest.fixture
+def click_client(monkeypatch):
+    async def lookup(station_uuid):
+        return None
+
+    index = server.StationSimilarityIndex()
+    index.add_stations(server.get_sample_radio_data("/json/stations/topvote"))
+    monkeypatch.setattr(server, "similarity_index", index)
+    monkeypatch.setattr(server, "trending_trackers", {"1h": server.TrendingTracker(3600)})
+    monkeypatch.setattr(server, "click_throttle", server.ClickThrottle())
+    monkeypatch.setattr(server, "get_station_by_uuid", lookup)
+    monkeypatch.setattr(server, "RADIO_API_SERVERS", [])
+    return TestClient(server.app, client=("10.0.0.2", 50000))
+
+
+def test_only_known_stations_trend(click_client):
+    for _ in range(5):
+        click_client.post("/api/radio/stations/<script>junk/click")
+        click_client.post("/api/radio/stations/sample-uuid-3/click")
+    trending = click_client.get("/api/radio/stations/trending?window=1h").json()
+    # Repeated clicks from one client count once, and unknown uuids never count
+    assert [(station["name"], station["trending_score"]) for station in trending] == [("NPR News", 1.0)]
+
+
+def test_clients_behind_same_proxy_are_counted_separately(click_client):
+    for client_ip in ["203.0.113.7", "203.0.113.8"]:
+        click_client.post(
+            "/api/radio/stations/sample-uuid-3/click",
+            headers={"X-Forwarded-For": client_ip}
+        )
+    trending = click_client.get("/api/radio/stations/trending?window=1h").json()
+    assert [(station["name"], station["trending_score"]) for station in trending] == [("NPR News", 2.0)]